@@ -5,9 +5,15 @@ import threading
 import time
 import sys
 import argparse
+import json
 import logging
 import re
 import os
+import signal
+from urllib.parse import urlparse
+import queue
+from collections import deque
+from concurrent.futures import Future
 from optuna.trial import TrialState
 # Import necessary functions directly from the internal module
 from optuna_dashboard._note import get_note_from_system_attrs, note_ver_key
@@ -20,6 +26,109 @@ logging.basicConfig(
 )
 logger = logging.getLogger("HumanTrialMonitor")
 
+# Note commands keyed by their group name in the combined command pattern,
+# mapped to the log label and the state they put the trial in
+_COMMANDS = {
+    "prune": ("🔶 PRUNE", TrialState.PRUNED),
+    "fail": ("🔴 FAIL", TrialState.FAIL),
+}
+
+# Trials that are still running and can always be told a final state
+_ACTIVE_STATES = frozenset({TrialState.RUNNING, TrialState.WAITING})
+# Plus COMPLETE, which can sometimes be changed depending on Optuna version (but not PRUNED/FAILED)
+_CHANGEABLE_STATES = _ACTIVE_STATES | {TrialState.COMPLETE}
+
+# Keys of the per-trial note versions, as written by optuna_dashboard's note_ver_key().
+# Both ways of reading versions keep exactly these, leaving out the study note's
+# "dashboard:note_ver", so switching between them doesn't look like a note change
+_TRIAL_NOTE_VER_KEY = re.compile(r"dashboard:\d+:note_ver")
+
+# Growing pauses (in seconds) between re-reads while verifying a state change
+_VERIFY_RETRY_DELAYS = (0.01, 0.03, 0.1, 0.3)
+
+# Upper bound on studies checked at the same time by the MonitorScheduler
+_MAX_CHECK_WORKERS = 4
+
+# CA certificate used automatically when neither --use-cert nor --no-cert is given
+_DEFAULT_CERT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cert", "ca.pem")
+
+def build_command_matcher(prune_pattern, fail_pattern):
+    """
+    Build the function that finds the first command in a note body.
+
+    The returned callable takes the note text and returns "prune", "fail" or
+    None. The command that starts earliest wins, and PRUNE wins a tie. Raises
+    re.error when either pattern is invalid on its own, so callers can
+    validate patterns with exactly the matcher the monitor will use.
+    """
+    prune_re = re.compile(prune_pattern, re.IGNORECASE)
+    fail_re = re.compile(fail_pattern, re.IGNORECASE)
+
+    # Search with each pattern on its own and keep the earlier match
+    def find_separately(note_body):
+        prune_match = prune_re.search(note_body)
+        fail_match = fail_re.search(note_body)
+        if fail_match is not None and (prune_match is None or fail_match.start() < prune_match.start()):
+            return "fail"
+        return "prune" if prune_match is not None else None
+
+    # Plain ASCII words (like the defaults) are found with str.find on the
+    # upper-cased note, which is cheaper than running the regex engine. Only
+    # ASCII notes take that path: upper() maps characters like 'ß' or 'ﬁ' to
+    # several letters, so on other text it matches where re.IGNORECASE doesn't
+    if all(p.isascii() and re.escape(p) == p for p in (prune_pattern, fail_pattern)):
+        literals = (("prune", prune_pattern.upper()), ("fail", fail_pattern.upper()))
+
+        def find_literal(note_body):
+            if not note_body.isascii():
+                return find_separately(note_body)
+            text = note_body.upper()
+            command = None
+            first_pos = len(text) + 1
+            for name, literal in literals:
+                pos = text.find(literal)
+                # Strictly earlier wins, so PRUNE keeps precedence on a tie
+                if pos != -1 and pos < first_pos:
+                    command, first_pos = name, pos
+            return command
+        return find_literal
+
+    # Both patterns in one pass, dispatched on the named group. Wrapping only keeps
+    # their meaning without groups of their own (numbered backreferences would shift,
+    # and a "prune"/"fail" group would clash) and without global inline flags like
+    # (?x), which must lead the whole expression
+    base_flags = re.compile("", re.IGNORECASE).flags
+    if prune_re.groups == fail_re.groups == 0 and prune_re.flags == fail_re.flags == base_flags:
+        try:
+            combined = re.compile(f"(?P<prune>{prune_pattern})|(?P<fail>{fail_pattern})", re.IGNORECASE)
+        except re.error:
+            combined = None
+        if combined is not None:
+            def find_combined(note_body):
+                match = combined.search(note_body)
+                return match.lastgroup if match is not None else None
+            return find_combined
+
+    return find_separately
+
+def create_storage(db_url):
+    """
+    Create the storage shared by every monitored study.
+
+    Passing the URL string to each optuna.load_study() call would build a
+    separate engine and connection pool per study, so build one here with a
+    pool sized for a long-running process and reuse it everywhere.
+    """
+    engine_kwargs = {"pool_pre_ping": True, "pool_recycle": 1800}
+    if not db_url.startswith("sqlite"):
+        engine_kwargs.update(pool_size=5, max_overflow=10)
+    # Label the monitor's connections in pg_stat_activity unless the URL names them already
+    if db_url.startswith("postgresql") and "application_name" not in db_url:
+        engine_kwargs["connect_args"] = {"application_name": "optuna_hitl_monitor"}
+    # get_storage() adds the same caching wrapper it would put around a URL
+    return optuna.storages.get_storage(optuna.storages.RDBStorage(url=db_url, engine_kwargs=engine_kwargs))
+
+
 class HumanTrialStateMonitor:
     """
     Optimized monitor for human-in-the-loop trial control via Optuna Dashboard notes.
@@ -34,11 +143,11 @@ class HumanTrialStateMonitor:
     - Customizable command patterns for different actions.
     - Dry-run mode for testing without making actual changes.
     - Efficient change detection to avoid redundant processing.
-    - Study version tracking to minimize database queries.
+    - Skips the trial scan entirely while no note version has changed.
     """
     def __init__(self, study, check_interval=10,
                  prune_pattern=r'PRUNE', fail_pattern=r'FAIL',
-                 dry_run=False, only_active_trials=False):
+                 dry_run=False, only_active_trials=False, verify_state_changes=False):
         """
         Initialize the monitor with the given parameters.
 
@@ -50,33 +159,53 @@ class HumanTrialStateMonitor:
             dry_run: If True, log actions but don't actually change trial states
             only_active_trials: If True, only monitor trials that are not already
                               in PRUNED, FAIL, or COMPLETE state
+            verify_state_changes: If True, read each changed trial back from storage
+                                  to confirm the new state
         """
         self.study = study
         self.check_interval = check_interval
-        self.running = True
+        # Set by stop(); waiting on it instead of sleeping lets shutdown interrupt a pause
+        self._stop_event = threading.Event()
         self.thread = None
         self.dry_run = dry_run
         self.only_active_trials = only_active_trials
+        self.verify_state_changes = verify_state_changes
+        # Trial states the scan asks storage for, based on what can be safely changed:
+        # only RUNNING and WAITING trials (most restrictive), or COMPLETE ones as well
+        self._changeable_states = _ACTIVE_STATES if only_active_trials else _CHANGEABLE_STATES
 
         # Compile regex patterns
         self.prune_pattern = re.compile(prune_pattern, re.IGNORECASE)
         self.fail_pattern = re.compile(fail_pattern, re.IGNORECASE)
-
-        # Get proper trial states
-        self.FAILED_STATE = TrialState.FAIL
+        self._find_command = build_command_matcher(prune_pattern, fail_pattern)
 
         # Keep track of processed note *versions* to avoid duplicate actions
         # Stores {trial_number: last_processed_note_version}
         self.processed_note_versions = {}
         # Cache for trial_ids to avoid repeated lookups
         self._trial_id_cache = {}
-        # Track last known study version to minimize DB queries
-        self._last_study_version = None
+        # Note version attribute key per trial_id, so the scan doesn't rebuild it every cycle
+        self._ver_key_cache = {}
         # Cache system attributes to reduce DB load
         self._cached_system_attrs = None
         self._cache_timestamp = 0
         # Smart monitoring optimizations
         self._last_check_timestamp = None
+        # Note version attributes seen by the last scan that processed every trial
+        # without errors; if they are unchanged, the next scan has nothing to do
+        self._last_note_versions = None
+        # State changes requested by notes during the current check cycle,
+        # as (trial_number, new_state, current_state) tuples applied once the scan is done
+        self._pending_state_changes = deque()
+        # Trial numbers currently in the queue, for O(1) duplicate checks
+        self._pending_trials = set()
+        # Finished trials whose state change study.tell() rejected; their notes
+        # are not re-checked since the change can never succeed
+        self._rejected_trials = set()
+        # True until the first scan completes. Commands standing on COMPLETE trials at
+        # that point were seen by an earlier run, or were written when tell() could no
+        # longer finish the trial, so they seed _rejected_trials instead of being replayed
+        self._first_scan = True
 
         logger_msg = [f"Monitor initialized for study: {study.study_name}"]
         if dry_run:
@@ -97,11 +226,11 @@ class HumanTrialStateMonitor:
             if hasattr(storage, 'get_trial_id_from_study_id_trial_number'):
                  trial_id = storage.get_trial_id_from_study_id_trial_number(study_id, trial_number)
             else:
-                 # Fallback: Get all trials and find the matching number
-                 all_trials_in_study = storage.get_all_trials(study_id, deepcopy=False)
-                 found_trial = next((t for t in all_trials_in_study if t.number == trial_number), None)
-                 if found_trial:
-                     trial_id = found_trial._trial_id
+                 # Fallback: Get the trials the monitor can change and find the matching number
+                 all_trials_in_study = storage.get_all_trials(study_id, deepcopy=False, states=self._changeable_states)
+                 # Cache every id from the fetch in one pass so later misses don't repeat it
+                 self._trial_id_cache.update({t.number: t._trial_id for t in all_trials_in_study})
+                 trial_id = self._trial_id_cache.get(trial_number)
 
             if trial_id is not None:
                 self._trial_id_cache[trial_number] = trial_id
@@ -114,10 +243,20 @@ class HumanTrialStateMonitor:
             return None
 
 
-    def check_for_note_changes(self):
+    def check_for_note_changes(self, note_version_attrs=None):
         """
         Check all relevant trials in the study for note changes efficiently
         and process any commands found in those notes.
+
+        Args:
+            note_version_attrs: The study's note_ver system attributes if the
+                                caller already fetched them. The full attributes,
+                                with the note bodies, are then only read when a
+                                version changed. Otherwise everything is read
+                                from storage up front.
+
+        Returns:
+            True if any trial's note changed since the last check
         """
         try:
             storage = self.study._storage
@@ -130,122 +269,213 @@ class HumanTrialStateMonitor:
             if self._last_check_timestamp is not None:
                 time_since_last_check = current_time - self._last_check_timestamp
                 if time_since_last_check < 5:  # Don't check too frequently
-                    return
+                    return False
             
             self._last_check_timestamp = current_time
             
-            # Cache system attributes with timestamp
-            if self._cached_system_attrs is None or (current_time - self._cache_timestamp) > 10:  # 10 second cache
-                system_attrs = storage.get_study_system_attrs(study_id)
-                self._cached_system_attrs = system_attrs
-                self._cache_timestamp = current_time
-            else:
-                system_attrs = self._cached_system_attrs
-
-            # Get all trials in the study, filtered if needed
-            all_trials = self.study.get_trials(deepcopy=False, states=None)
+            # Cache system attributes with timestamp, unless the caller passed the versions in
+            system_attrs = None
+            if note_version_attrs is None:
+                if self._cached_system_attrs is None or (current_time - self._cache_timestamp) > 10:  # 10 second cache
+                    system_attrs = storage.get_study_system_attrs(study_id)
+                    self._cached_system_attrs = system_attrs
+                    self._cache_timestamp = current_time
+                else:
+                    system_attrs = self._cached_system_attrs
+                note_version_attrs = system_attrs
+
+            # Every note edit bumps a note_ver attribute, so when those are the same
+            # as after the last clean scan, skip fetching and scanning the trials
+            note_versions = frozenset(
+                (key, value) for key, value in note_version_attrs.items() if _TRIAL_NOTE_VER_KEY.fullmatch(key)
+            )
+            if note_versions == self._last_note_versions:
+                return False
+
+            # Let the storage filter by state so PRUNED/FAILED trials are never
+            # materialized; they can no longer be changed anyway
+            state_filtered_trials = self.study.get_trials(deepcopy=False, states=self._changeable_states)
+            # The fetched trials already carry their ids, so fill the id cache in one
+            # pass instead of looking up each new trial number separately
+            trial_id_cache = self._trial_id_cache
+            for trial in state_filtered_trials:
+                if trial.number not in trial_id_cache:
+                    trial_id_cache[trial.number] = trial._trial_id
 
-            # Filter trials based on what can be safely changed
-            if self.only_active_trials:
-                # Monitor only RUNNING and WAITING trials (most restrictive)
-                changeable_states = [TrialState.RUNNING, TrialState.WAITING]
-            else:
-                # Monitor RUNNING, WAITING, and COMPLETE trials (but not PRUNED/FAILED)
-                # COMPLETE trials can sometimes be changed depending on Optuna version
-                changeable_states = [TrialState.RUNNING, TrialState.WAITING, TrialState.COMPLETE]
-            
-            # Pre-filter by state
-            state_filtered_trials = [t for t in all_trials if t.state in changeable_states]
-            
-            # Smart optimization: Only check trials with potential note changes
+            # Smart optimization: Only check trials whose note version is new to us.
+            # A note added to a RUNNING/WAITING trial bumps its version too, so the
+            # version comparison alone finds every trial that needs a look
             trials_to_check = []
+            # Bind the lookups used for every trial to locals once per cycle
+            ver_key_cache = self._ver_key_cache
+            rejected_trials = self._rejected_trials
+            processed_versions = self.processed_note_versions
+            get_attr = note_version_attrs.get
             for trial in state_filtered_trials:
                 trial_id = trial._trial_id
                 trial_number = trial.number
-                
-                # Check if this trial has a note version that's new to us
-                version_key = f"dashboard:{trial_id}:note_ver"
-                current_version = int(system_attrs.get(version_key, 0))
-                last_processed_version = self.processed_note_versions.get(trial_number, -1)
-                
-                # Include trial if:
-                # 1. Never processed before (last_processed_version == -1)
-                # 2. Note version has changed
-                # 3. Trial is RUNNING/WAITING (notes might be added)
-                if (last_processed_version == -1 or 
-                    current_version > last_processed_version or
-                    trial.state in [TrialState.RUNNING, TrialState.WAITING]):
-                    trials_to_check.append(trial)
+                if trial_number in rejected_trials:
+                    continue
+
+                version_key = ver_key_cache.get(trial_id)
+                if version_key is None:
+                    version_key = ver_key_cache[trial_id] = note_ver_key(trial_id)
+                # No version attribute means the note was never saved, so there is nothing to read
+                raw_version = get_attr(version_key)
+                if raw_version is None:
+                    continue
+                # Use -1 so version 0 of a never-processed trial still counts as new
+                current_version = int(raw_version)
+                if current_version > processed_versions.get(trial_number, -1):
+                    trials_to_check.append((trial, current_version))
             
             # Log smart filtering results
-            if len(trials_to_check) < len(state_filtered_trials):
+            if logger.isEnabledFor(logging.DEBUG) and len(trials_to_check) < len(state_filtered_trials):
                 excluded_count = len(state_filtered_trials) - len(trials_to_check)
                 mode = "active-only" if self.only_active_trials else "changeable"
-                logger.debug(f"Smart filtering: checking {len(trials_to_check)} trials with potential changes out of {len(state_filtered_trials)} {mode} trials ({excluded_count} skipped as unchanged)")
+                logger.debug("Smart filtering: checking %d trials with potential changes out of %d %s trials (%d skipped as unchanged)",
+                             len(trials_to_check), len(state_filtered_trials), mode, excluded_count)
+
+            # Only versions were passed in; read the note bodies now that some changed
+            if trials_to_check and system_attrs is None:
+                system_attrs = storage.get_study_system_attrs(study_id)
 
             # Process each relevant trial  
-            for trial in trials_to_check:
+            all_processed = True
+            for trial, current_version in trials_to_check:
                 try:
-                    # Pass pre-fetched system_attrs for efficiency
-                    self._check_and_process_trial(trial, system_attrs)
+                    # Pass pre-fetched system_attrs and the version read above for efficiency
+                    if not self._check_and_process_trial(trial, system_attrs, current_version):
+                        all_processed = False
                 except Exception as e:
                     # Log error for specific trial processing but continue loop
-                    logger.error(f"Error processing trial #{trial.number}: {e}")
+                    logger.error("Error processing trial #%d: %s", trial.number, e)
+                    all_processed = False
+
+            self._apply_pending_state_changes()
+            self._evict_unscanned_trials(state_filtered_trials)
+            # Trials that failed are retried on the next cycle even if no note changes
+            self._last_note_versions = note_versions if all_processed else None
+            self._first_scan = False
+            return bool(trials_to_check)
 
         except Exception as e:
             # Log error for the overall check cycle
             logger.error(f"Error during note change check cycle: {e}")
+            return False
 
-    def _check_and_process_trial(self, trial, system_attrs):
+    def _evict_unscanned_trials(self, scanned_trials):
         """
-        Check if a trial's note version has changed and process commands if needed.
+        Drop per-trial bookkeeping for trials that were not part of this scan.
 
-        Args:
-            trial: The optuna.FrozenTrial object to check.
-            system_attrs: Pre-fetched system attributes for the study.
+        Trials leave the scan once they reach a state outside the changeable
+        ones (e.g. after being pruned) and never come back, so their cache and
+        version entries would otherwise accumulate for the monitor's lifetime.
         """
-        trial_number = trial.number
-        trial_id = self._get_trial_id(trial_number)
-
-        if trial_id is None:
-            return # Cannot process without trial_id
+        scanned_numbers = {trial.number for trial in scanned_trials}
+        for bookkeeping in (self._trial_id_cache, self.processed_note_versions):
+            for trial_number in bookkeeping.keys() - scanned_numbers:
+                del bookkeeping[trial_number]
+        self._rejected_trials &= scanned_numbers
 
-        try:
-            # --- Optimization 2: Check note version first ---
-            version_key = note_ver_key(trial_id)
-            current_note_version = int(system_attrs.get(version_key, 0))
-            last_processed_version = self.processed_note_versions.get(trial_number, -1) # Use -1 to process version 0
-
-            # Only process if the note version is new
-            if current_note_version > last_processed_version:
-                # Extract the note body *only* when the version has changed
-                note_data = get_note_from_system_attrs(system_attrs, trial_id)
-                note_body = note_data["body"]
-
-                if not note_body and last_processed_version == -1 and current_note_version == 0:
-                     # Skip empty initial notes unless explicitly processed before
-                     pass
-                else:
-                    logger.info(f"📝 Trial #{trial_number} note changed (v{current_note_version}): '{note_body[:100]}{'...' if len(note_body)>100 else ''}'")
+        scanned_ids = {trial._trial_id for trial in scanned_trials}
+        for trial_id in self._ver_key_cache.keys() - scanned_ids:
+            del self._ver_key_cache[trial_id]
 
-                    # Process the note content for commands
-                    if self.prune_pattern.search(note_body):
-                        logger.info(f"🔶 PRUNE command found in trial #{trial_number}")
-                        self._change_trial_state(trial_number, TrialState.PRUNED)
-                    elif self.fail_pattern.search(note_body):
-                        logger.info(f"🔴 FAIL command found in trial #{trial_number}")
-                        self._change_trial_state(trial_number, self.FAILED_STATE)
+    def _check_and_process_trial(self, trial, system_attrs, current_note_version):
+        """
+        Process commands in a trial's note whose version has changed.
 
-                    # Update the processed version *after* processing
-                    self.processed_note_versions[trial_number] = current_note_version
+        Args:
+            trial: The optuna.FrozenTrial object to check.
+            system_attrs: Pre-fetched system attributes for the study.
+            current_note_version: The note version found by the scan, which is
+                                  newer than the last one processed.
 
-            # Clean up cache for finished trials to prevent memory leak if monitoring all trials
-            if trial.state.is_finished() and trial_number in self._trial_id_cache:
-                 del self._trial_id_cache[trial_number]
+        Returns:
+            False if the trial could not be processed and should be retried
+        """
+        trial_number = trial.number
+        # The trial came from this cycle's fetch, so its id is already at hand
+        trial_id = trial._trial_id
+
+        # Errors are left to the caller, which logs them and retries the trial next cycle
+        # Extract the note body *only* now that the version is known to have changed
+        note_data = get_note_from_system_attrs(system_attrs, trial_id)
+        note_body = note_data["body"]
+
+        if not note_body:
+            # An empty or cleared note holds no command; just remember this version
+            self.processed_note_versions[trial_number] = current_note_version
+            return True
+
+        if logger.isEnabledFor(logging.INFO):
+            preview = note_body if len(note_body) <= 100 else note_body[:100] + '...'
+            logger.info("📝 Trial #%d note changed (v%d): '%s'", trial_number, current_note_version, preview)
+
+        # Process the note content for commands (the first command in the note wins)
+        command = self._find_command(note_body)
+        if command is not None:
+            label, new_state = _COMMANDS[command]
+            if self._first_scan and trial.state == TrialState.COMPLETE:
+                # Replaying it would only make study.tell() fail on the finished trial
+                self._rejected_trials.add(trial_number)
+                logger.debug("%s command on COMPLETE trial #%d predates this run; ignoring its future notes", label, trial_number)
+            else:
+                logger.info("%s command found in trial #%d", label, trial_number)
+                self._queue_state_change(trial_number, new_state, trial.state)
+
+        # Update the processed version *after* processing
+        self.processed_note_versions[trial_number] = current_note_version
+        return True
+
+    def _queue_state_change(self, trial_number, new_state, current_state):
+        """Queue a state change for a trial unless one is already pending."""
+        if trial_number in self._pending_trials:
+            return
+        self._pending_trials.add(trial_number)
+        self._pending_state_changes.append((trial_number, new_state, current_state))
+
+    def _apply_pending_state_changes(self):
+        """Apply the state changes queued while scanning notes in this cycle."""
+        pending = self._pending_state_changes
+        changes = []
+        while pending:
+            change = pending.popleft()
+            self._pending_trials.discard(change[0])
+            changes.append(change)
+        if changes:
+            self._change_trial_states_batch(changes)
+
+    def _change_trial_states_batch(self, changes):
+        """
+        Apply several state changes, then verify them together.
 
+        Args:
+            changes: List of (trial_number, new_state, current_state) tuples
+        """
+        applied = [(trial_number, new_state) for trial_number, new_state, current_state in changes
+                   if self._change_trial_state(trial_number, new_state, current_state)]
+        # study.tell() has already written the state, so reading it back is opt-in
+        if not applied or not self.verify_state_changes:
+            return
+
+        # Verify the changes by checking storage again, polling briefly instead of
+        # sleeping a fixed delay since the state is usually there on the first read
+        for trial_number, new_state in applied:
+            updated_state = self._get_trial_state_from_storage(trial_number)
+            for delay in _VERIFY_RETRY_DELAYS:
+                if updated_state == new_state:
+                    break
+                time.sleep(delay)
+                updated_state = self._get_trial_state_from_storage(trial_number)
 
-        except Exception as e:
-            logger.error(f"Error checking/processing note for trial #{trial_number}: {e}")
+            if updated_state == new_state:
+                logger.info("Successfully verified trial #%d state changed to %s", trial_number, new_state)
+            elif updated_state is not None:
+                logger.warning("Verification failed for trial #%d. State is %s, expected %s", trial_number, updated_state, new_state)
+            else:
+                logger.warning("Could not verify state change for trial #%d.", trial_number)
 
     def _get_trial_state_from_storage(self, trial_number):
         """Get the current state of a trial directly from storage."""
@@ -263,63 +493,67 @@ class HumanTrialStateMonitor:
             return None
 
 
-    def _change_trial_state(self, trial_number, new_state):
+    def _change_trial_state(self, trial_number, new_state, current_state=None):
         """
-        Change a trial's state using study.tell() and verify using storage.
+        Change a trial's state using study.tell().
 
         Args:
             trial_number: The number of the trial to modify
             new_state: The new TrialState to set
+            current_state: The trial's state when its note was read; fetched
+                           from storage if not given
+
+        Returns:
+            True if study.tell() was called and the change should be verified
         """
         try:
-            # Get current state directly from storage to avoid study.get_trial()
-            current_state = self._get_trial_state_from_storage(trial_number)
+            # The scan already knows the state, so only hit storage when it wasn't passed in
+            if current_state is None:
+                current_state = self._get_trial_state_from_storage(trial_number)
 
             if current_state is None:
-                logger.error(f"Could not determine current state for trial #{trial_number}. Skipping state change.")
-                return
+                logger.error("Could not determine current state for trial #%d. Skipping state change.", trial_number)
+                return False
 
             # Skip if already in the target state
             if current_state == new_state:
-                logger.info(f"Trial #{trial_number} is already in state {new_state}")
+                logger.info("Trial #%d is already in state %s", trial_number, new_state)
                 # Ensure version is marked as processed even if state doesn't change
                 # Note: This logic is now handled in _check_and_process_trial
-                return
+                return False
 
             # Skip if trial is not in a state that can be changed by tell()
             # Typically RUNNING or WAITING. COMPLETE might sometimes be allowed depending on Optuna version/storage.
-            if current_state not in [TrialState.RUNNING, TrialState.WAITING, TrialState.COMPLETE]:
-                logger.warning(f"Cannot change trial #{trial_number} from state {current_state} to {new_state} using study.tell()")
-                return
+            if current_state not in _CHANGEABLE_STATES:
+                logger.warning("Cannot change trial #%d from state %s to %s using study.tell()", trial_number, current_state, new_state)
+                return False
 
             # Change the state (or just log in dry-run mode)
             if self.dry_run:
-                logger.info(f"DRY RUN: Would change trial #{trial_number} from {current_state} to {new_state}")
+                logger.info("DRY RUN: Would change trial #%d from %s to %s", trial_number, current_state, new_state)
+                return False
             else:
-                logger.info(f"Attempting to change trial #{trial_number} state from {current_state} to {new_state}")
+                logger.info("Attempting to change trial #%d state from %s to %s", trial_number, current_state, new_state)
                 # Use study.tell() as it seems available based on previous logs
                 try:
                     self.study.tell(trial_number, state=new_state, values=None) # Explicitly set values=None for PRUNE/FAIL
-                    logger.info(f"study.tell() called for trial #{trial_number} to set state {new_state}")
+                    logger.info("study.tell() called for trial #%d to set state %s", trial_number, new_state)
                 except Exception as tell_error:
-                     logger.error(f"Error calling study.tell() for trial #{trial_number}: {tell_error}")
+                     logger.error("Error calling study.tell() for trial #%d: %s", trial_number, tell_error)
+                     # The state seen during the scan may be stale, so read the real one now
+                     current_state = self._get_trial_state_from_storage(trial_number)
+                     if current_state is not None and current_state.is_finished():
+                         # Finished trials stay unchangeable, so stop checking this one
+                         self._rejected_trials.add(trial_number)
+                         logger.info("Trial #%d is %s and cannot be changed; ignoring its future notes", trial_number, current_state)
                      # Don't proceed with verification if tell failed
-                     return
-
-                # Verify the change by checking storage again
-                time.sleep(0.5) # Add a small delay to allow storage update
-                updated_state = self._get_trial_state_from_storage(trial_number)
-
-                if updated_state == new_state:
-                    logger.info(f"Successfully verified trial #{trial_number} state changed to {new_state}")
-                elif updated_state is not None:
-                    logger.warning(f"Verification failed for trial #{trial_number}. State is {updated_state}, expected {new_state}")
-                else:
-                    logger.warning(f"Could not verify state change for trial #{trial_number}.")
+                     return False
+                return True
 
         except Exception as e:
             # Log the specific error related to state change
             logger.error(f"Unexpected error during state change process for trial #{trial_number}: {e}")
+            return False
 
 
     def monitor_loop(self):
@@ -327,11 +561,12 @@ class HumanTrialStateMonitor:
         logger.info("Starting monitor thread")
         consecutive_errors = 0
         max_consecutive_errors = 5
+        idle_streak = 0
         
-        while self.running:
+        while not self._stop_event.is_set():
             try:
                 # Check for note changes
-                self.check_for_note_changes()
+                changed = self.check_for_note_changes()
                 # Reset error counter on success
                 consecutive_errors = 0
             except Exception as e:
@@ -341,25 +576,29 @@ class HumanTrialStateMonitor:
                 # If too many consecutive errors, increase sleep time
                 if consecutive_errors >= max_consecutive_errors:
                     logger.error(f"Too many consecutive errors. Pausing for {self.check_interval * 10} seconds...")
-                    time.sleep(self.check_interval * 10)
+                    if self._stop_event.wait(self.check_interval * 10):
+                        break
                     consecutive_errors = 0  # Reset counter after long pause
                     # Try to clear caches in case of stale data
                     self._trial_id_cache.clear()
+                    self._ver_key_cache.clear()
                     self._cached_system_attrs = None
                     logger.info("Cleared caches and resuming monitoring...")
                 else:
                     # Shorter pause for transient errors
-                    time.sleep(self.check_interval * 2)
+                    self._stop_event.wait(self.check_interval * 2)
                 continue
 
-            time.sleep(self.check_interval)
+            # Back off while nothing changes, and return to the base interval as soon as a note does
+            idle_streak = 0 if changed else idle_streak + 1
+            self._stop_event.wait(min(self.check_interval * 2 ** min(idle_streak, 3), self.check_interval * 5))
         logger.info("Monitor thread finished.")
 
 
     def start(self):
         """Start the monitoring thread"""
         if self.thread is None or not self.thread.is_alive():
-            self.running = True
+            self._stop_event.clear()
             # Use a more descriptive thread name
             self.thread = threading.Thread(target=self.monitor_loop, name=f"OptunaMonitor-{self.study.study_name}")
             self.thread.daemon = True
@@ -369,7 +608,7 @@ class HumanTrialStateMonitor:
     def stop(self):
         """Stop the monitoring thread"""
         logger.info(f"Stopping monitor thread for study '{self.study.study_name}'...")
-        self.running = False
+        self._stop_event.set()
         if self.thread and self.thread.is_alive():
             # Wait a bit longer if needed
             self.thread.join(timeout=max(10, self.check_interval * 2))
@@ -381,7 +620,205 @@ class HumanTrialStateMonitor:
             logger.info("Monitor thread was not running or already stopped.")
 
 
-def main():
+class _DaemonWorkerPool:
+    """
+    Minimal thread pool whose workers are daemon threads.
+
+    concurrent.futures.ThreadPoolExecutor joins its workers when the interpreter
+    exits, so one check stuck on a stalled query would keep the process alive
+    long after stop() gave up waiting for it. Daemon workers are abandoned instead.
+    """
+    def __init__(self, max_workers, thread_name_prefix):
+        self._tasks = queue.SimpleQueue()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"{thread_name_prefix}_{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            future, fn, args = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) for a worker and return its Future."""
+        future = Future()
+        self._tasks.put((future, fn, args))
+        return future
+
+    def shutdown(self):
+        """Let idle workers exit without waiting for any that are still busy."""
+        for _ in self._workers:
+            self._tasks.put(None)
+
+
+class MonitorScheduler:
+    """
+    Run the note checks of several monitors from one shared scheduler thread.
+
+    Instead of every HumanTrialStateMonitor polling the database from its own
+    thread, registered monitors are checked once per interval on a small,
+    bounded worker pool. Thread count and concurrent DB polls stay constant
+    no matter how many studies are monitored. On an RDB storage the note versions of
+    all studies are read with one query per cycle.
+    """
+    def __init__(self, check_interval=10, on_exit=None):
+        """
+        Args:
+            check_interval: How often to check all registered monitors (in seconds)
+            on_exit: Optional callable invoked when the shared thread finishes
+        """
+        self.check_interval = check_interval
+        self.on_exit = on_exit
+        self.monitors = []
+        # Cycles in a row in which no study's notes changed; stretches the wait below
+        self._idle_streak = 0
+        self._max_interval = check_interval * 5
+        self._stop_event = threading.Event()
+        self.thread = None
+        # Whether the batched note-version read has failed once; the fallback to
+        # per-study reads is only logged the first time, not on every cycle
+        self._prefetch_failed = False
+        # Set when Optuna's ORM internals can't be imported, which won't change later
+        self._prefetch_unavailable = False
+
+    def register(self, monitor):
+        """Add a monitor whose study is checked on every cycle."""
+        self.monitors.append(monitor)
+
+    def _prefetch_note_versions(self):
+        """
+        Read the note_ver attributes of every monitored study in a single query.
+
+        Only the small version counters are transferred; a monitor reads its
+        study's note bodies itself once one of the versions has changed.
+
+        Returns:
+            {study_id: {note_ver_key: version}}, or None if the studies don't
+            share one RDBStorage, in which case each monitor fetches its own
+            study's attributes
+        """
+        if not self.monitors or self._prefetch_unavailable:
+            return None
+        storage = self.monitors[0].study._storage
+        backend = getattr(storage, "_backend", storage)
+        if not isinstance(backend, optuna.storages.RDBStorage):
+            return None
+        if any(monitor.study._storage is not storage for monitor in self.monitors):
+            return None
+
+        study_ids = [monitor.study._study_id for monitor in self.monitors]
+        versions_by_study = {study_id: {} for study_id in study_ids}
+        try:
+            # ORM models and session helper, for reading several studies' attributes in
+            # one query. They are Optuna internals, so an Optuna that moves them only
+            # costs this shortcut, not the whole monitor
+            from optuna.storages._rdb import models as rdb_models
+            from optuna.storages._rdb.storage import _create_scoped_session
+        except ImportError as e:
+            self._prefetch_unavailable = True
+            logger.warning(f"Batched note-version reads are unavailable with this Optuna version, using per-study reads: {e}")
+            return None
+        model = rdb_models.StudySystemAttributeModel
+        try:
+            with _create_scoped_session(backend.scoped_session) as session:
+                rows = (
+                    session.query(model.study_id, model.key, model.value_json)
+                    .filter(model.study_id.in_(study_ids), model.key.like("dashboard:%:note_ver"))
+                    .all()
+                )
+        except Exception as e:
+            if not self._prefetch_failed:
+                self._prefetch_failed = True
+                logger.warning(f"Could not prefetch note versions, falling back to per-study reads: {e}")
+            else:
+                logger.debug(f"Could not prefetch note versions: {e}")
+            return None
+        for study_id, key, value_json in rows:
+            # LIKE's wildcard is looser than the key shape the per-study path keeps
+            if _TRIAL_NOTE_VER_KEY.fullmatch(key):
+                versions_by_study[study_id][key] = json.loads(value_json)
+        return versions_by_study
+
+    def _run_cycle(self, pool):
+        """
+        Check every registered monitor once on the worker pool.
+
+        Returns:
+            True if any study's notes changed during the cycle
+        """
+        versions_by_study = self._prefetch_note_versions()
+        futures = []
+        for monitor in self.monitors:
+            note_versions = versions_by_study.get(monitor.study._study_id) if versions_by_study else None
+            futures.append((monitor, pool.submit(monitor.check_for_note_changes, note_versions)))
+
+        changed = False
+        for monitor, future in futures:
+            try:
+                if future.result():
+                    changed = True
+            except Exception as e:
+                logger.error(f"Error checking study '{monitor.study.study_name}': {e}")
+        return changed
+
+    def monitor_loop(self):
+        """Check all registered monitors on a small worker pool, then sleep for the interval"""
+        logger.info(f"Starting shared monitor thread for {len(self.monitors)} studies")
+        # Studies wait on the database independently, so a few workers overlap their
+        # queries; the cap keeps concurrent connections well inside the shared pool
+        max_workers = max(1, min(_MAX_CHECK_WORKERS, len(self.monitors)))
+        pool = _DaemonWorkerPool(max_workers, thread_name_prefix="OptunaMonitorCheck")
+        try:
+            while not self._stop_event.is_set():
+                changed = self._run_cycle(pool)
+                # Back off while nothing changes, and return to the base interval as soon as a note does
+                self._idle_streak = 0 if changed else self._idle_streak + 1
+                interval = min(self.check_interval * 2 ** min(self._idle_streak, 3), self._max_interval)
+                self._stop_event.wait(interval)
+        finally:
+            pool.shutdown()
+            logger.info("Shared monitor thread finished.")
+            if self.on_exit is not None:
+                self.on_exit()
+
+    def start(self):
+        """Start the shared monitoring thread"""
+        if self.thread is None or not self.thread.is_alive():
+            self._stop_event.clear()
+            self.thread = threading.Thread(target=self.monitor_loop, name="OptunaMonitorScheduler")
+            self.thread.daemon = True
+            self.thread.start()
+            logger.info(f"Shared monitor thread started for {len(self.monitors)} studies")
+
+    def stop(self):
+        """Stop the shared monitoring thread"""
+        logger.info("Stopping shared monitor thread...")
+        self._stop_event.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=max(10, self.check_interval * 2))
+            if self.thread.is_alive():
+                 logger.warning("Shared monitor thread did not stop gracefully.")
+            else:
+                 logger.info("Shared monitor thread stopped.")
+        else:
+            logger.info("Shared monitor thread was not running or already stopped.")
+
+
+def parse_args(argv=None):
+    """Parse the monitor's command line; argv defaults to sys.argv[1:]."""
     parser = argparse.ArgumentParser(description="Optimized Human-in-the-loop trial state monitor for Optuna")
     # Database connection options
     db_group = parser.add_argument_group('Database connection')
@@ -404,10 +841,19 @@ def main():
     monitor_group.add_argument("--fail-pattern", default="FAIL", help="Regex pattern to detect FAIL commands (default: 'FAIL')")
     monitor_group.add_argument("--dry-run", action="store_true", help="Run in dry-run mode (no changes applied)")
     monitor_group.add_argument("--only-active-trials", action="store_true", help="Monitor only RUNNING and WAITING trials (excludes COMPLETE trials which may have notes added later)")
+    monitor_group.add_argument("--verify-state-changes", action="store_true", help="Read changed trials back from storage to confirm their new state")
     monitor_group.add_argument("--verbose", action="store_true", help="Enable verbose logging (DEBUG level)")
 
-    args = parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the monitor from command-line arguments; argv defaults to sys.argv[1:]."""
+    return run(parse_args(argv))
 
+
+def run(args):
+    """Run the monitor with already-parsed arguments, as returned by parse_args()."""
     # Set logging level based on verbosity
     log_level = logging.DEBUG if args.verbose else logging.INFO
     # Reconfigure root logger if needed, or just our logger
@@ -442,9 +888,8 @@ def main():
             use_cert = True
         else:
             # If neither --use-cert nor --no-cert was specified, check for default cert
-            default_cert_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cert", "ca.pem")
-            if os.path.exists(default_cert_path):
-                cert_path = default_cert_path
+            if os.path.exists(_DEFAULT_CERT_PATH):
+                cert_path = _DEFAULT_CERT_PATH
                 use_cert = True
                 logger.info(f"Automatically using default CA certificate at {cert_path}")
             else:
@@ -472,16 +917,39 @@ def main():
         sys.exit(1)
 
     # Connect to the database
-    logger.info(f"Connecting to database associated with host: {args.db_host or db_url.split('@')[-1].split('/')[0]}") # Mask password if using URL
+    # Only the host is logged, never the URL with its credentials; urlparse also copes
+    # with an '@' inside the password
+    logger.info(f"Connecting to database associated with host: {args.db_host or urlparse(db_url).hostname or 'local file'}")
 
     monitors = []
+    # Set on SIGINT/SIGTERM or when the shared thread exits; run() just waits on it
+    shutdown = threading.Event()
+
+    def _scheduler_exited():
+        if not scheduler._stop_event.is_set():
+            logger.warning("The monitor thread seems to have stopped unexpectedly.")
+        shutdown.set()
+
+    scheduler = MonitorScheduler(check_interval=args.interval, on_exit=_scheduler_exited)
+    # Signal handlers can only be installed from the main thread (the launcher
+    # runs run() from a worker thread and handles signals itself)
+    if threading.current_thread() is threading.main_thread():
+        def _request_shutdown(signum, frame):
+            # Event.set() takes the Event's non-reentrant lock, which the main thread may
+            # be holding inside shutdown.wait() right now, so set it from another thread
+            threading.Thread(target=shutdown.set, name="MonitorShutdown", daemon=True).start()
+            logger.info(f"Received {signal.Signals(signum).name}. Stopping monitors...")
+        signal.signal(signal.SIGINT, _request_shutdown)
+        signal.signal(signal.SIGTERM, _request_shutdown)
     try:
+        storage = create_storage(db_url)
         studies_to_monitor = []
         if args.study:
             # Check if user wants to monitor all studies
             if len(args.study) == 1 and args.study[0].lower() == 'all':
                 logger.info("Loading all studies from the database...")
-                all_study_summaries = optuna.get_all_study_summaries(storage=db_url)
+                # Only the names are needed, so skip the per-study best-trial lookup
+                all_study_summaries = optuna.get_all_study_summaries(storage=storage, include_best_trial=False)
                 if not all_study_summaries:
                     logger.warning("No studies found in the database to monitor.")
                     return 0
@@ -505,6 +973,8 @@ def main():
             return 0
 
         for study_name in studies_to_monitor:
+            if shutdown.is_set():
+                break
             logger.info(f"Loading study: {study_name}")
             # Retry logic for loading study
             max_retries = 3
@@ -512,35 +982,44 @@ def main():
             
             for retry in range(max_retries):
                 try:
-                    study = optuna.load_study(study_name=study_name, storage=db_url)
+                    # The monitor never samples, so skip building the default TPE sampler
+                    study = optuna.load_study(study_name=study_name, storage=storage,
+                                              sampler=optuna.samplers.RandomSampler())
                     monitor = HumanTrialStateMonitor(
                         study,
                         check_interval=args.interval,
                         prune_pattern=args.prune_pattern,
                         fail_pattern=args.fail_pattern,
                         dry_run=args.dry_run,
-                        only_active_trials=args.only_active_trials
+                        only_active_trials=args.only_active_trials,
+                        verify_state_changes=args.verify_state_changes
                     )
-                    monitor.start()
+                    scheduler.register(monitor)
                     monitors.append(monitor)
-                    logger.info(f"Started monitoring for study: {study_name}")
+                    logger.info(f"Registered study for monitoring: {study_name}")
                     break  # Success
                 except Exception as load_err:
                     if retry < max_retries - 1:
                         logger.warning(f"Failed to load study '{study_name}' (attempt {retry + 1}/{max_retries}): {load_err}")
                         logger.info(f"Retrying in {retry_delay} seconds...")
-                        time.sleep(retry_delay)
+                        # Wait on the shutdown event so Ctrl+C isn't held up by the retries
+                        if shutdown.wait(retry_delay):
+                            break
                         retry_delay *= 2  # Exponential backoff
                     else:
                         logger.error(f"Failed to load or start monitor for study '{study_name}' after {max_retries} attempts: {load_err}")
 
-        if monitors:
-            logger.info(f"Successfully started monitoring for {len(monitors)} studies.")
+        if shutdown.is_set():
+            logger.info("Shutdown requested while loading studies. Exiting.")
+            return 0
 
         if not monitors:
              logger.warning("No monitors started. Exiting.")
              return 0
 
+        scheduler.start()
+        logger.info(f"Successfully started monitoring for {len(monitors)} studies.")
+
         # Keep the script running
         logger.info(f"Monitor(s) running. Configuration:")
         logger.info(f"  - Prune pattern: '{args.prune_pattern}'")
@@ -550,20 +1029,15 @@ def main():
         logger.info(f"  - Monitoring {'only potentially active' if args.only_active_trials else 'all'} trials")
         logger.info("Press Ctrl+C to stop.")
 
-        while True:
-            # Check if any monitor threads are still alive
-            if not any(m.thread and m.thread.is_alive() for m in monitors):
-                 logger.warning("All monitor threads seem to have stopped unexpectedly.")
-                 break
-            time.sleep(5) # Main thread sleep
+        # Block until a signal arrives or the shared thread exits, without polling
+        shutdown.wait()
 
     except KeyboardInterrupt:
         logger.info("Ctrl+C received. Stopping monitors...")
     except Exception as e:
         logger.error(f"An unexpected error occurred in the main loop: {e}", exc_info=True)
     finally:
-        for monitor in monitors:
-            monitor.stop()
+        scheduler.stop()
         logger.info("All monitors stopped. Exiting.")
         sys.exit(0)
 
@@ -7,9 +7,36 @@ import os
 import time
 import atexit
 import signal
-from . import human_trial_monitor # Import the human_trial_monitor module
+import re
 import threading
 import socket
+import tempfile
+import shutil
+import functools
+import importlib
+import concurrent.futures
+from typing import NamedTuple, Optional
+from urllib.parse import urlparse
+from importlib.metadata import distribution, PackageNotFoundError
+
+class _DBSpec(NamedTuple):
+    """How to connect to one database type."""
+    scheme: str
+    default_port: Optional[str]
+    # SSL query suffix for the URL; {cert} is the CA certificate path
+    ssl_template: Optional[str]
+    # Driver package to install, and the module it provides
+    driver_package: Optional[str]
+    driver_module: Optional[str]
+
+_DB_SPECS = {
+    "postgresql": _DBSpec("postgresql", "5432", "?sslmode=require&sslrootcert={cert}", "psycopg2-binary", "psycopg2"),
+    "mysql": _DBSpec("mysql", "3306", "?ssl_ca={cert}", "mysqlclient", "MySQLdb"),
+    "sqlite": _DBSpec("sqlite", None, None, None, None),
+}
+
+# CA certificate used automatically when neither --use-cert nor --no-cert is given
+_DEFAULT_CERT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cert", "ca.pem")
 
 # List to keep track of child processes
 CHILD_PROCESSES = []
@@ -17,72 +44,201 @@ CHILD_PROCESSES = []
 # SSH tunnel process
 SSH_TUNNEL_PROCESS = None
 
+# Control socket for --ssh-multiplex; %C is a hash of the connection, which keeps
+# the path short enough for a unix socket whatever the host and user names
+SSH_CONTROL_PATH = os.path.expanduser("~/.ssh/optuna-dashboard-%C")
+
+# With --ssh-multiplex the forward belongs to the shared master, which outlives our
+# ssh process; this command asks the master to drop it again on cleanup
+SSH_CANCEL_FORWARD_CMD = None
+
+# Set once the launcher should stop; the main thread waits on it instead of polling
+_SHUTDOWN = threading.Event()
+
+# Set once cleanup has run; it is reached from both atexit and main()'s finally block
+_CLEANED_UP = False
+
+def _signal_process(p, sig):
+    """Send sig to a child, or to its whole process group if it leads its own session."""
+    try:
+        # Children started with start_new_session=True lead their own group, so the
+        # signal reaches anything they spawned; the ssh tunnel shares our group
+        if os.getpgid(p.pid) == p.pid:
+            os.killpg(p.pid, sig)
+        else:
+            p.send_signal(sig)
+    except ProcessLookupError:
+        pass  # Already gone
+
 def cleanup_processes():
     """Terminate all child processes."""
+    global _CLEANED_UP
+    if _CLEANED_UP:
+        return
+    _CLEANED_UP = True
+
     print("\nStopping services...")
-    for p in CHILD_PROCESSES:
-        if p.poll() is None:  # Process is still running
-            print(f"Terminating process {p.pid}...")
-            p.terminate()
-            p.wait(timeout=5)
-            if p.poll() is None:
-                print(f"Killing process {p.pid}...")
-                p.kill()
-    
+    processes = [p for p in CHILD_PROCESSES if p.poll() is None]  # Process is still running
     # Clean up SSH tunnel if it exists
-    global SSH_TUNNEL_PROCESS
     if SSH_TUNNEL_PROCESS and SSH_TUNNEL_PROCESS.poll() is None:
-        print("Terminating SSH tunnel...")
-        SSH_TUNNEL_PROCESS.terminate()
-        SSH_TUNNEL_PROCESS.wait(timeout=5)
-        if SSH_TUNNEL_PROCESS.poll() is None:
-            print("Killing SSH tunnel...")
-            SSH_TUNNEL_PROCESS.kill()
+        processes.append(SSH_TUNNEL_PROCESS)
+
+    # Ask every process to stop first, then give them one shared grace period
+    for p in processes:
+        name = "SSH tunnel" if p is SSH_TUNNEL_PROCESS else f"process {p.pid}"
+        print(f"Terminating {name}...")
+        _signal_process(p, signal.SIGTERM)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and any(p.poll() is None for p in processes):
+        time.sleep(0.05)
+
+    for p in processes:
+        if p.poll() is None:
+            name = "SSH tunnel" if p is SSH_TUNNEL_PROCESS else f"process {p.pid}"
+            print(f"Killing {name}...")
+            _signal_process(p, signal.SIGKILL)
+            try:
+                p.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                print(f"Warning: {name} did not exit after SIGKILL", file=sys.stderr)
+    
+    if SSH_CANCEL_FORWARD_CMD:
+        print("Releasing the SSH port forward on the shared connection...")
+        try:
+            subprocess.run(SSH_CANCEL_FORWARD_CMD, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass  # The master is gone or stuck, which takes the forward with it
     
     print("Cleaned up and stopped services.")
 
 # Register cleanup function to be called on exit
 atexit.register(cleanup_processes)
 
-# Handle signals for graceful shutdown
+# Handle signals for graceful shutdown. The handler only records the request (even a
+# print could re-enter a stdout write it interrupted); main() acts on it between steps
 def signal_handler(signum, frame):
-    print(f"Signal {signum} received. Initiating graceful shutdown...")
-    sys.exit(0)
+    # Not _SHUTDOWN.set() directly: it takes the Event's non-reentrant lock, which the
+    # main thread may be holding inside one of its _SHUTDOWN.wait() calls right now
+    threading.Thread(target=_SHUTDOWN.set, name="ShutdownRequest", daemon=True).start()
+
+def _exit_if_shutdown_requested():
+    """Leave main() (and so run the atexit cleanup) once a signal has asked us to stop."""
+    if _SHUTDOWN.is_set():
+        print("Shutdown requested. Stopping services...")
+        sys.exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
+@functools.lru_cache(maxsize=None)
 def package_installed(package_name):
     """Check if a Python package is installed."""
+    # Read the installed metadata in-process instead of starting `pip show`
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "show", package_name], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        distribution(package_name)
         return True
-    except subprocess.CalledProcessError:
+    except PackageNotFoundError:
         return False
 
-def install_package(package_name):
-    """Install a Python package."""
-    print(f"Installing {package_name}...")
+def module_importable(module_name):
+    """Check if a Python module can actually be imported."""
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package_name])
-        print(f"Successfully installed {package_name}.")
+        importlib.import_module(module_name)
+        return True
+    except ImportError:
+        return False
+
+def install_packages(package_names):
+    """Install several Python packages with a single pip call."""
+    print(f"Installing {', '.join(package_names)}...")
+    try:
+        # Don't let pip check for its own updates or wait on an interactive prompt
+        subprocess.check_call([sys.executable, "-m", "pip", "install",
+                               "--disable-pip-version-check", "--no-input", *package_names])
+        print(f"Successfully installed {', '.join(package_names)}.")
+        # The cached "not installed" answers are stale now
+        package_installed.cache_clear()
     except subprocess.CalledProcessError as e:
-        print(f"Error installing {package_name}: {e}", file=sys.stderr)
+        print(f"Error installing {', '.join(package_names)}: {e}", file=sys.stderr)
         sys.exit(1)
 
+def require_executable(name, hint):
+    """Return the absolute path of an executable on PATH, or exit with a hint."""
+    path = shutil.which(name)
+    if path is None:
+        print(f"Error: '{name}' was not found on PATH. {hint}", file=sys.stderr)
+        sys.exit(1)
+    return path
+
+@functools.lru_cache(maxsize=None)
+def _tool_path(name):
+    """Absolute path of an external tool, looked up on PATH once (None if missing)."""
+    return shutil.which(name)
+
+@functools.lru_cache(maxsize=None)
+def is_wsl():
+    """Whether we run under WSL, whose port release lags; /proc/version is read once."""
+    try:
+        with open('/proc/version', 'r') as f:
+            return 'microsoft' in f.read().lower()
+    except OSError:
+        return False
+
+def run_tool(name, *args, **kwargs):
+    """
+    subprocess.run() an external tool by its absolute path.
+
+    Raises FileNotFoundError when the tool is not installed, as running it by
+    name would, so callers keep their existing error handling.
+    """
+    path = _tool_path(name)
+    if path is None:
+        raise FileNotFoundError(f"{name} not found on PATH")
+    return subprocess.run([path, *args], **kwargs)
+
 def find_free_port():
-    """Find a free port on localhost."""
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind(('', 0))
-        s.listen(1)
-        port = s.getsockname()[1]
-    return port
+    """
+    Reserve a free port on localhost.
+
+    Returns the bound socket together with its port. Keep the socket open
+    until the process that will listen on the port is accepting connections,
+    so no other program can take the port in between. SO_REUSEADDR and not
+    listening let that process bind the port while it is still reserved.
+    """
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind(('127.0.0.1', 0))
+    return s, s.getsockname()[1]
+
+def wait_for_listener(port, timeout, process=None):
+    """
+    Wait until something accepts TCP connections on localhost:port.
+
+    Returns True as soon as a connection succeeds, or False on timeout or
+    when the given process exits before the port opens.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return True
+        except OSError:
+            if _SHUTDOWN.wait(0.05):
+                return False
+    return False
 
 def is_port_in_use(port):
     """Check if a port is already in use."""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # Bind exactly as the dashboard's server will (SO_REUSEADDR on 0.0.0.0), so the
+        # probe fails precisely when the dashboard would. On BSD/macOS SO_REUSEADDR only
+        # refuses an identical address, so probing 127.0.0.1 would miss a 0.0.0.0 listener
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         try:
-            s.bind(('127.0.0.1', port))
+            s.bind(('0.0.0.0', port))
             return False
         except OSError:
             return True
@@ -90,88 +246,123 @@ def is_port_in_use(port):
 def wait_for_port_available(port, timeout=30):
     """Wait for a port to become available."""
     print(f"Waiting up to {timeout} seconds for port {port} to become available...")
-    start_time = time.time()
-    last_check_time = 0
+    start_time = time.monotonic()
+    last_report_time = 0
+    reported_owners = False
+    # A port usually frees within a fraction of a second of its owner exiting, so
+    # probe quickly at first and back off to once a second for slow releases
+    delay = 0.05
     
-    while time.time() - start_time < timeout:
-        current_time = time.time() - start_time
+    while time.monotonic() - start_time < timeout:
+        current_time = time.monotonic() - start_time
         if not is_port_in_use(port):
             print(f"Port {port} is now available after {current_time:.1f} seconds")
             return True
         
         # Show progress every 5 seconds
-        if current_time - last_check_time >= 5:
+        if current_time - last_report_time >= 5:
             print(f"Still waiting for port {port}... ({current_time:.0f}s elapsed)")
-            last_check_time = current_time
+            last_report_time = current_time
             
-            # Try to find what's still using the port
+        # Try once to find what's still using the port, if it is taking a while
+        if not reported_owners and current_time >= 10:
+            reported_owners = True
             try:
-                result = subprocess.run(['lsof', '-ti', f':{port}'], capture_output=True, text=True)
+                result = run_tool('lsof', '-ti', f':{port}', capture_output=True, text=True)
                 if result.stdout.strip():
                     remaining_pids = result.stdout.strip().split('\n')
                     print(f"Processes still using port {port}: {', '.join(remaining_pids)}")
             except:
                 pass
         
-        time.sleep(1)
+        if _SHUTDOWN.wait(delay):
+            return False
+        delay = min(1.0, delay * 1.5)
     
     print(f"Timeout waiting for port {port} to become available")
     return False
 
 
+def find_port_owners_proc(port):
+    """
+    Find the PIDs with a TCP socket on the given local port by reading /proc.
+
+    Returns a set of PID strings, or None when /proc/net/tcp is unavailable
+    (non-Linux). Processes whose file descriptors we may not read are skipped.
+    """
+    inodes = set()
+    found_table = False
+    for table in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(table) as f:
+                next(f)  # Header line
+                for line in f:
+                    fields = line.split()
+                    # fields[1] is the local address as HEXADDR:HEXPORT, fields[9] the inode;
+                    # inode 0 marks sockets no process holds (e.g. TIME_WAIT)
+                    if int(fields[1].rsplit(':', 1)[1], 16) == port and fields[9] != '0':
+                        inodes.add(f"socket:[{fields[9]}]")
+            found_table = True
+        except (OSError, StopIteration):
+            pass
+    if not found_table:
+        return None
+    
+    owners = set()
+    if not inodes:
+        return owners
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit():
+            continue
+        try:
+            for fd in os.scandir(f"/proc/{entry.name}/fd"):
+                if os.readlink(fd.path) in inodes:
+                    owners.add(entry.name)
+                    break
+        except OSError:
+            pass  # Exited meanwhile, or owned by another user
+    return owners
+
+def child_pids(pid):
+    """PIDs whose parent is pid, read from /proc; None when /proc is unavailable."""
+    try:
+        entries = os.scandir('/proc')
+    except OSError:
+        return None
+    children = []
+    with entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry.name}/stat") as f:
+                    # The command name may contain spaces, so split after its closing parenthesis
+                    ppid = f.read().rsplit(')', 1)[1].split()[1]
+            except (OSError, IndexError):
+                continue  # Exited meanwhile
+            if ppid == str(pid):
+                children.append(int(entry.name))
+    return children
+
 def kill_process_on_port(port):
     """Try to kill ALL processes using the specified port."""
     killed_any = False
-    pids_to_kill = set()
-    
-    # Step 1: Collect ALL PIDs using the port
-    try:
-        # Try lsof first - it can return multiple PIDs
-        result = subprocess.run(['lsof', '-ti', f':{port}'], capture_output=True, text=True)
-        if result.returncode == 0 and result.stdout.strip():
-            # lsof returns one PID per line
-            for line in result.stdout.strip().split('\n'):
-                if line.strip().isdigit():
-                    pids_to_kill.add(line.strip())
-    except FileNotFoundError:
-        pass
     
-    # Also try fuser which is good at finding all processes
-    try:
-        result = subprocess.run(['fuser', f'{port}/tcp'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-        if result.stdout:
-            # fuser output format: "8080/tcp:   12345 12346 12347"
-            parts = result.stdout.split()
-            for part in parts:
-                if part.isdigit():
-                    pids_to_kill.add(part)
-    except FileNotFoundError:
-        pass
+    # Step 1: Collect ALL PIDs using the port, without starting any tools if /proc can tell us
+    pids_to_kill = find_port_owners_proc(port)
     
-    # Try netstat as backup
-    if not pids_to_kill:
+    # Without /proc (macOS, BSD) ask lsof instead. On Linux lsof, fuser, netstat and ss
+    # read the same /proc files, so they could not find an owner that the scan missed
+    if pids_to_kill is None:
+        pids_to_kill = set()
         try:
-            result = subprocess.run(['netstat', '-tlnp'], capture_output=True, text=True)
-            for line in result.stdout.split('\n'):
-                if f':{port}' in line and 'LISTEN' in line:
-                    parts = line.split()
-                    if len(parts) >= 7:
-                        pid_prog = parts[6]
-                        if '/' in pid_prog:
-                            pid = pid_prog.split('/')[0]
-                            if pid.isdigit():
-                                pids_to_kill.add(pid)
-        except Exception:
-            pass
-    
-    # Try ss as last resort
-    if not pids_to_kill:
-        try:
-            result = subprocess.run(['ss', '-tlnp', f'sport = :{port}'], capture_output=True, text=True)
-            import re
-            for match in re.finditer(r'pid=(\d+)', result.stdout):
-                pids_to_kill.add(match.group(1))
-        except Exception:
+            # lsof returns one PID per line
+            result = run_tool('lsof', '-ti', f':{port}', capture_output=True, text=True)
+            if result.returncode == 0 and result.stdout.strip():
+                for line in result.stdout.strip().split('\n'):
+                    if line.strip().isdigit():
+                        pids_to_kill.add(line.strip())
+        except FileNotFoundError:
             pass
     
     if not pids_to_kill:
@@ -180,70 +371,113 @@ def kill_process_on_port(port):
     
     print(f"Found {len(pids_to_kill)} process(es) using port {port}: {', '.join(pids_to_kill)}")
     
-    # Step 2: Kill all processes and their children
+    # Step 2: Kill all processes and their children. Signal them all first and share one
+    # grace period, so freeing the port takes about a second however many owners it has
+    terminated = []
     for pid in pids_to_kill:
         try:
-            # First try to kill the entire process group
             print(f"Killing process {pid} and its children...")
             
-            # Try pkill to kill process tree
-            subprocess.run(['pkill', '-TERM', '-P', pid], capture_output=True)
-            time.sleep(0.5)
-            
-            # Then kill the main process
-            subprocess.run(['kill', '-TERM', pid], capture_output=True)
-            time.sleep(0.5)
+            # Terminate its children first, so none of them keeps the port open
+            children = child_pids(pid)
+            if children is None:
+                # No /proc to read parents from; pkill matches them by parent instead
+                try:
+                    run_tool('pkill', '-TERM', '-P', pid, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                except FileNotFoundError:
+                    pass
+            else:
+                for child in children:
+                    try:
+                        os.kill(child, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
             
-            # Force kill if still alive
-            subprocess.run(['kill', '-9', pid], capture_output=True)
+            # Then the main process
+            os.kill(int(pid), signal.SIGTERM)
+            terminated.append(int(pid))
             killed_any = True
-            
+        except ProcessLookupError:
+            killed_any = True  # Already gone
         except Exception as e:
             print(f"Error killing process {pid}: {e}")
     
-    # Step 3: Extra cleanup - kill any remaining processes by name
-    try:
-        # Common process names that might hold the port
-        for proc_name in ['node', 'python', 'gunicorn', 'optuna-dashboard']:
-            result = subprocess.run(['pgrep', '-f', proc_name], capture_output=True, text=True)
-            if result.returncode == 0:
-                for pid in result.stdout.strip().split('\n'):
-                    if pid.strip().isdigit():
-                        # Check if this process is actually using our port
-                        check = subprocess.run(['lsof', '-p', pid, '-i', f':{port}'], 
-                                             capture_output=True, text=True)
-                        if check.returncode == 0 and check.stdout:
-                            print(f"Found {proc_name} process {pid} still using port, killing...")
-                            subprocess.run(['kill', '-9', pid], capture_output=True)
-                            killed_any = True
-    except:
-        pass
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+    
+    deadline = time.monotonic() + 1
+    while terminated and time.monotonic() < deadline:
+        terminated = [pid for pid in terminated if _alive(pid)]
+        if terminated:
+            time.sleep(0.05)
+    
+    # Force kill whatever ignored SIGTERM
+    for pid in terminated:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass  # Exited just now
+        except Exception as e:
+            print(f"Error killing process {pid}: {e}")
+    
+    # Step 3: Extra cleanup - kill anything that picked up the port meanwhile (e.g. a
+    # worker that inherited the socket), from one fresh /proc snapshot
+    remaining = find_port_owners_proc(port)
+    if remaining is not None:
+        for pid in remaining:
+            print(f"Found process {pid} still using port, killing...")
+            try:
+                os.kill(int(pid), signal.SIGKILL)
+                killed_any = True
+            except OSError:
+                pass  # Already gone, or not ours to kill
+    else:
+        try:
+            # Without /proc, check common process names that might hold the port
+            for proc_name in ['node', 'python', 'gunicorn', 'optuna-dashboard']:
+                result = run_tool('pgrep', '-f', proc_name, capture_output=True, text=True)
+                if result.returncode == 0:
+                    for pid in result.stdout.strip().split('\n'):
+                        if pid.strip().isdigit():
+                            # Check if this process is actually using our port
+                            check = run_tool('lsof', '-p', pid, '-i', f':{port}', capture_output=True, text=True)
+                            if check.returncode == 0 and check.stdout:
+                                print(f"Found {proc_name} process {pid} still using port, killing...")
+                                try:
+                                    os.kill(int(pid), signal.SIGKILL)
+                                    killed_any = True
+                                except OSError:
+                                    pass
+        except:
+            pass
     
     # Wait a bit longer for ports to be released
     if killed_any:
         print("Waiting for port to be released...")
-        time.sleep(3)
+        _SHUTDOWN.wait(3)
         
         # WSL-specific: Sometimes we need to wait longer for port release
-        if os.path.exists('/proc/version'):
-            try:
-                with open('/proc/version', 'r') as f:
-                    if 'microsoft' in f.read().lower():
-                        print("WSL detected - waiting additional time for port release...")
-                        time.sleep(2)
-            except:
-                pass
+        if is_wsl():
+            print("WSL detected - waiting additional time for port release...")
+            _SHUTDOWN.wait(2)
     
     return killed_any
 
-def create_ssh_tunnel(ssh_host, ssh_user, ssh_port, db_host, db_port, ssh_key_path=None, ssh_password=None):
+def create_ssh_tunnel(ssh_host, ssh_user, ssh_port, db_host, db_port, ssh_key_path=None, ssh_password=None, multiplex=False):
     """Create an SSH tunnel and return the local port."""
-    global SSH_TUNNEL_PROCESS
+    global SSH_TUNNEL_PROCESS, SSH_CANCEL_FORWARD_CMD
     
-    local_port = find_free_port()
+    ssh_bin = require_executable("ssh", "Install an OpenSSH client to use --ssh-host.")
+    port_reservation, local_port = find_free_port()
     
     # Build SSH command
-    ssh_cmd = ["ssh", "-N", "-L", f"{local_port}:{db_host}:{db_port}"]
+    ssh_cmd = [ssh_bin, "-N", "-L", f"{local_port}:{db_host}:{db_port}"]
     
     if ssh_key_path:
         ssh_cmd.extend(["-i", ssh_key_path])
@@ -259,21 +493,42 @@ def create_ssh_tunnel(ssh_host, ssh_user, ssh_port, db_host, db_port, ssh_key_pa
         "-o", "ServerAliveCountMax=3"
     ])
     
+    if multiplex:
+        # Share one authenticated connection per host between launches: the first
+        # launch starts a background master, later ones within 10 minutes reuse it
+        ssh_cmd.extend([
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={SSH_CONTROL_PATH}",
+            "-o", "ControlPersist=10m"
+        ])
+    
     ssh_cmd.append(f"{ssh_user}@{ssh_host}")
     
     print(f"Creating SSH tunnel: {' '.join(ssh_cmd)}")
+    if multiplex:
+        # Same forward, options and destination as the tunnel, so it reaches the same master
+        SSH_CANCEL_FORWARD_CMD = [ssh_bin, "-O", "cancel", *ssh_cmd[2:]]
     
+    # ssh -N prints nothing useful on stdout, and nobody drains a pipe once the tunnel is
+    # up; stderr goes to an unbounded temp file that is only read if ssh fails to start
+    ssh_stderr = tempfile.TemporaryFile()
     try:
-        SSH_TUNNEL_PROCESS = subprocess.Popen(ssh_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        SSH_TUNNEL_PROCESS = subprocess.Popen(ssh_cmd, stdout=subprocess.DEVNULL, stderr=ssh_stderr)
         
-        # Wait a moment for the tunnel to establish
-        time.sleep(3)
-        
-        # Check if the process is still running
-        if SSH_TUNNEL_PROCESS.poll() is not None:
-            _, stderr = SSH_TUNNEL_PROCESS.communicate()
-            print(f"SSH tunnel failed to start. Error: {stderr.decode()}", file=sys.stderr)
-            sys.exit(1)
+        # Wait for the forwarder to accept connections instead of sleeping a fixed time
+        if not wait_for_listener(local_port, timeout=15, process=SSH_TUNNEL_PROCESS):
+            _exit_if_shutdown_requested()
+            # Check if the process is still running. A client that handed the forward
+            # to an existing master exits cleanly, so probe its port once more then
+            if SSH_TUNNEL_PROCESS.poll() == 0 and multiplex and wait_for_listener(local_port, timeout=2):
+                print(f"SSH tunnel established on local port {local_port} (reusing shared connection)")
+                return local_port
+            if SSH_TUNNEL_PROCESS.poll() is not None:
+                ssh_stderr.seek(0)
+                stderr = ssh_stderr.read().decode(errors="replace")
+                print(f"SSH tunnel failed to start. Error: {stderr}", file=sys.stderr)
+                sys.exit(1)
+            print(f"Warning: SSH tunnel on local port {local_port} is not accepting connections yet, proceeding anyway...", file=sys.stderr)
         
         print(f"SSH tunnel established on local port {local_port}")
         return local_port
@@ -281,8 +536,13 @@ def create_ssh_tunnel(ssh_host, ssh_user, ssh_port, db_host, db_port, ssh_key_pa
     except Exception as e:
         print(f"Error creating SSH tunnel: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        # ssh binds the forward only after authenticating, so the reservation is held
+        # until the forwarder is listening or ssh has given up
+        port_reservation.close()
 
-def main():
+def _build_parser():
+    """Build the launcher's command-line parser."""
     parser = argparse.ArgumentParser(description="Launch Optuna Dashboard and Human-in-the-Loop Monitor.")
 
     # Database connection options
@@ -293,7 +553,7 @@ def main():
     db_group.add_argument("--db-name", default="optuna", help="Database name (default: optuna)")
     db_group.add_argument("--db-user", default="optuna", help="Database username (default: optuna)")
     db_group.add_argument("--db-password", default="password", help="Database password (default: password)")
-    db_group.add_argument("--db-type", default="postgresql", choices=["postgresql", "mysql", "sqlite"], help="Database type (postgresql, mysql, sqlite) (default: postgresql)")
+    db_group.add_argument("--db-type", default="postgresql", choices=list(_DB_SPECS), help="Database type (postgresql, mysql, sqlite) (default: postgresql)")
     db_group.add_argument("--cert-path", help="Path to CA certificate file")
     db_group.add_argument("--use-cert", action="store_true", help="Explicitly use the certificate specified by --cert-path (overrides --no-cert)")
     db_group.add_argument("--no-cert", action="store_true", help="Explicitly disable certificate usage (overrides --cert-path and default detection)")
@@ -305,6 +565,7 @@ def main():
     ssh_group.add_argument("--ssh-port", type=int, default=22, help="SSH port for tunneling (default: 22)")
     ssh_group.add_argument("--ssh-key", help="Path to SSH private key file")
     ssh_group.add_argument("--ssh-password", help="SSH password (not recommended, use SSH keys instead)")
+    ssh_group.add_argument("--ssh-multiplex", action="store_true", help="Reuse a shared SSH connection (ControlMaster) across launches for 10 minutes")
 
     # Monitor configuration
     monitor_group = parser.add_argument_group('Monitor configuration')
@@ -322,8 +583,10 @@ def main():
     # Browser launch options
     browser_group = parser.add_mutually_exclusive_group()
     browser_group.add_argument("--browser-path", help="Launch specified browser executable with the dashboard URL.")
+    return parser
 
-    args = parser.parse_args()
+def main():
+    args = _build_parser().parse_args()
 
     # Validate SSH tunnel arguments
     if (args.ssh_host or args.ssh_user) and not (args.ssh_host and args.ssh_user):
@@ -336,6 +599,43 @@ def main():
     if args.ssh_host and args.ssh_user and not args.ssh_key and not args.ssh_password:
         print("Warning: No SSH authentication method specified. SSH agent or default key will be used.", file=sys.stderr)
 
+    # Install required packages
+    print("Checking required packages...")
+    required_packages = ["optuna", "optuna-dashboard"]
+    missing_packages = [pkg for pkg in required_packages if not package_installed(pkg)]
+    # Check the driver by importing it: any distribution of it will do (e.g. psycopg2
+    # built from source rather than psycopg2-binary), and a broken C extension shows up here
+    db_spec = _DB_SPECS[args.db_type]
+    if db_spec.driver_package and not module_importable(db_spec.driver_module):
+        missing_packages.append(db_spec.driver_package)
+    if missing_packages:
+        install_packages(missing_packages)
+        _exit_if_shutdown_requested()
+
+    # Check if we should start the monitor
+    should_start_monitor = True
+    if not args.study or (args.study and all(not s.strip() for s in args.study)):
+        # No studies specified or all are empty strings
+        should_start_monitor = False
+
+    # Reject a bad command pattern now, before ssh or the dashboard are started. The
+    # check uses the monitor's own matcher, so it needs the packages installed above;
+    # --help and argument errors have returned before anything heavy is imported
+    if should_start_monitor and not args.cleanup_port:
+        # Compiling each pattern first names the option at fault
+        for option, pattern in (("--prune-pattern", args.prune_pattern), ("--fail-pattern", args.fail_pattern)):
+            try:
+                re.compile(pattern, re.IGNORECASE)
+            except re.error as e:
+                print(f"Error: Invalid {option} '{pattern}': {e}", file=sys.stderr)
+                sys.exit(2)
+        from . import human_trial_monitor
+        try:
+            human_trial_monitor.build_command_matcher(args.prune_pattern, args.fail_pattern)
+        except re.error as e:
+            print(f"Error: Invalid --prune-pattern '{args.prune_pattern}' or --fail-pattern '{args.fail_pattern}': {e}", file=sys.stderr)
+            sys.exit(2)
+
     # Handle SSH tunneling if specified
     original_db_host = args.db_host
     original_db_port = args.db_port
@@ -347,11 +647,8 @@ def main():
         
         # Set default port if not provided
         if not original_db_port:
-            if args.db_type == "postgresql":
-                original_db_port = "5432"
-            elif args.db_type == "mysql":
-                original_db_port = "3306"
-            else:
+            original_db_port = db_spec.default_port
+            if not original_db_port:
                 print(f"Warning: No default port for DB_TYPE: {args.db_type}. Please specify --db-port.", file=sys.stderr)
                 sys.exit(1)
         
@@ -365,8 +662,10 @@ def main():
             db_host=original_db_host,
             db_port=original_db_port,
             ssh_key_path=args.ssh_key,
-            ssh_password=args.ssh_password
+            ssh_password=args.ssh_password,
+            multiplex=args.ssh_multiplex
         )
+        _exit_if_shutdown_requested()
         
         # Update connection parameters to use the tunnel
         args.db_host = "localhost"
@@ -393,59 +692,32 @@ def main():
             use_cert = True
         else:
             # Auto-detect default cert
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            default_cert_path = os.path.join(script_dir, "cert", "ca.pem")
-            if os.path.exists(default_cert_path):
-                cert_path = default_cert_path
+            if os.path.exists(_DEFAULT_CERT_PATH):
+                cert_path = _DEFAULT_CERT_PATH
                 use_cert = True
                 print(f"Automatically using default CA certificate at {cert_path}")
             else:
                 cert_path = ""
                 use_cert = False
 
-        # Set default port if not provided
-        db_port = args.db_port
-        if not db_port:
-            if args.db_type == "postgresql":
-                db_port = "5432"
-            elif args.db_type == "mysql":
-                db_port = "3306"
-            else:
-                print(f"Warning: No default port for DB_TYPE: {args.db_type}. Please specify --db-port.", file=sys.stderr)
-                sys.exit(1) # Exit if port is critical and not provided
-
         # Construct DB URL from components
-        if args.db_type == "postgresql":
-            db_url = f"postgresql://{args.db_user}:{args.db_password}@{args.db_host}:{db_port}/{args.db_name}"
-            if use_cert and cert_path:
-                db_url = f"{db_url}?sslmode=require&sslrootcert={cert_path}"
-        elif args.db_type == "mysql":
-            db_url = f"mysql://{args.db_user}:{args.db_password}@{args.db_host}:{db_port}/{args.db_name}"
-            if use_cert and cert_path:
-                db_url = f"{db_url}?ssl_ca={cert_path}"
-        elif args.db_type == "sqlite":
+        if db_spec.scheme == "sqlite":
+            # A file path, so there is no server, port or certificate
             db_url = f"sqlite:///{args.db_name}"
         else:
-            print(f"Error: Unsupported database type: {args.db_type}", file=sys.stderr)
-            sys.exit(1)
+            # Set default port if not provided
+            db_port = args.db_port or db_spec.default_port
+            db_url = f"{db_spec.scheme}://{args.db_user}:{args.db_password}@{args.db_host}:{db_port}/{args.db_name}"
+            if use_cert and cert_path:
+                db_url += db_spec.ssl_template.format(cert=cert_path)
 
     if not db_url:
         print("Database URL is required. Provide either --db-url or all of: --db-host, --db-port, --db-name, --db-user, --db-password", file=sys.stderr)
         sys.exit(1)
 
-    print(f"Connecting to database associated with host: {args.db_host or db_url.split('@')[-1].split('/')[0]}")
-
-    # Install required packages
-    print("Checking required packages...")
-    required_packages = ["optuna", "optuna-dashboard"]
-    if args.db_type == "postgresql":
-        required_packages.append("psycopg2-binary")
-    elif args.db_type == "mysql":
-        required_packages.append("mysqlclient")
-
-    for pkg in required_packages:
-        if not package_installed(pkg):
-            install_package(pkg)
+    # Only the host is shown, never the URL with its credentials. It comes from the final
+    # URL, so it is right for --db-url (where --db-host keeps its default) and for tunnels
+    print(f"Connecting to database associated with host: {urlparse(db_url).hostname or 'local file'}")
 
     # Handle cleanup-only mode
     if args.cleanup_port:
@@ -457,6 +729,7 @@ def main():
                     print(f"✅ Successfully cleaned up port {args.port}")
                     sys.exit(0)
                 else:
+                    _exit_if_shutdown_requested()
                     print(f"❌ Port {args.port} is still in use after cleanup")
                     sys.exit(1)
             else:
@@ -474,7 +747,7 @@ def main():
             
             # Show what's using the port before killing
             try:
-                result = subprocess.run(['lsof', '-ti', f':{args.port}'], capture_output=True, text=True)
+                result = run_tool('lsof', '-ti', f':{args.port}', capture_output=True, text=True)
                 if result.stdout.strip():
                     pids = result.stdout.strip().split('\n')
                     print(f"Processes using port {args.port}: {', '.join(pids)}")
@@ -485,11 +758,12 @@ def main():
                 print(f"Process cleanup completed for port {args.port}")
                 # Wait longer for port to be released (increased timeout)
                 if not wait_for_port_available(args.port, timeout=15):
+                    _exit_if_shutdown_requested()
                     print(f"Error: Port {args.port} still in use after killing process", file=sys.stderr)
                     
                     # Final diagnostic - show what's still using the port
                     try:
-                        result = subprocess.run(['lsof', '-i', f':{args.port}'], capture_output=True, text=True)
+                        result = run_tool('lsof', '-i', f':{args.port}', capture_output=True, text=True)
                         if result.stdout:
                             print("Processes still using the port:", file=sys.stderr)
                             print(result.stdout, file=sys.stderr)
@@ -506,90 +780,80 @@ def main():
             print(f"Use --force-port to kill the existing process, or choose a different port with --port", file=sys.stderr)
             sys.exit(1)
 
+    _exit_if_shutdown_requested()
+
     # Launch Optuna Dashboard
     print(f"Starting optuna-dashboard on port {args.port}...")
-    dashboard_cmd = ["optuna-dashboard", db_url, "--port", str(args.port), "--host", "0.0.0.0"]
-    dashboard_process = subprocess.Popen(dashboard_cmd, preexec_fn=os.setsid)
+    dashboard_bin = require_executable("optuna-dashboard", "Install it with 'pip install optuna-dashboard'.")
+    dashboard_cmd = [dashboard_bin, db_url, "--port", str(args.port), "--host", "0.0.0.0"]
+    dashboard_process = subprocess.Popen(dashboard_cmd, start_new_session=True)
     CHILD_PROCESSES.append(dashboard_process)
     print("Loading all studies from the database")
 
-    # Wait for dashboard to initialize with retries
+    # Wait until the dashboard accepts connections, for at most 10 seconds
     print("Waiting for dashboard to initialize...")
-    max_retries = 10
-    for _ in range(max_retries):
-        time.sleep(1)
-        if dashboard_process.poll() is not None:
-            print(f"Error: Optuna dashboard failed to start", file=sys.stderr)
-            sys.exit(1)
-        
-        # Check if port is now in use (dashboard started successfully)
-        if is_port_in_use(args.port):
-            print("Dashboard initialized successfully")
-            break
+    if wait_for_listener(args.port, timeout=10, process=dashboard_process):
+        print("Dashboard initialized successfully")
+    elif dashboard_process.poll() is not None:
+        print(f"Error: Optuna dashboard failed to start", file=sys.stderr)
+        sys.exit(1)
     else:
+        _exit_if_shutdown_requested()
         print("Warning: Could not confirm dashboard started, but proceeding...")
 
-    # Check if we should start the monitor
-    should_start_monitor = True
-    if not args.study or (args.study and all(not s.strip() for s in args.study)):
-        # No studies specified or all are empty strings
+    if not should_start_monitor:
         print("No studies specified for monitoring.")
         print("Dashboard will run without the Human-in-the-loop monitor.")
         print("To enable monitoring, specify studies with --study study1 study2 or --study all")
-        should_start_monitor = False
     
     # Launch Human Trial Monitor in a separate thread (if needed)
-    monitor_thread = None
-    monitor_error = None
-    
     if should_start_monitor:
         print("Starting Human-in-the-loop Trial Monitor...")
+        # human_trial_monitor was imported when the patterns were validated
+        
+        # Start from the monitor's own defaults so every option it defines is
+        # present, then override what the launcher controls. The URL is
+        # complete, so the component and certificate options keep their defaults.
+        monitor_args = human_trial_monitor.parse_args([])
+        monitor_args.db_url = db_url
+        monitor_args.db_type = args.db_type
+        monitor_args.study = args.study
+        monitor_args.interval = args.interval
+        monitor_args.prune_pattern = args.prune_pattern
+        monitor_args.fail_pattern = args.fail_pattern
+        monitor_args.dry_run = args.dry_run
+        monitor_args.only_active_trials = not args.all_trials # Monitor only active trials by default
+        monitor_args.verbose = args.verbose
+        
+        # The monitor's outcome arrives through a Future, so failures are reported
+        # whenever they happen rather than only if they beat a fixed startup delay
+        monitor_future = concurrent.futures.Future()
         
         def run_monitor():
-            nonlocal monitor_error
+            monitor_future.set_running_or_notify_cancel()
             try:
-                # Pass arguments directly to human_trial_monitor.main()
-                monitor_args = [
-                f"--db-url={db_url}",
-                f"--interval={args.interval}",
-                f"--prune-pattern={args.prune_pattern}",
-                f"--fail-pattern={args.fail_pattern}"
-                ]
-                if args.study:
-                    # Pass all study names as arguments after a single --study flag
-                    monitor_args.extend(["--study"] + args.study)
-                if args.dry_run:
-                    monitor_args.append("--dry-run")
-                if not args.all_trials:
-                    monitor_args.append("--only-active-trials") # Monitor only active trials by default
-                if args.verbose:
-                    monitor_args.append("--verbose")
-                
-                # Always enable some debug logging for troubleshooting
-                print(f"Starting monitor with args: {' '.join(monitor_args)}")
-
-                # Temporarily replace sys.argv to pass arguments to human_trial_monitor.main()
-                original_argv = sys.argv
-                sys.argv = [human_trial_monitor.__file__] + monitor_args
-                try:
-                    monitor_exit_code = human_trial_monitor.main()
-                    if monitor_exit_code != 0:
-                        monitor_error = f"Human Trial Monitor exited with code {monitor_exit_code}"
-                finally:
-                    sys.argv = original_argv # Restore sys.argv
+                monitor_future.set_result(human_trial_monitor.run(monitor_args))
+            except SystemExit as e:
+                # run() ends through sys.exit() on several paths
+                monitor_future.set_result(e.code or 0)
             except Exception as e:
-                monitor_error = f"Error in monitor thread: {e}"
+                monitor_future.set_exception(e)
         
-        # Start monitor in thread
-        monitor_thread = threading.Thread(target=run_monitor, name="HumanTrialMonitorLauncher")
-        monitor_thread.daemon = True
-        monitor_thread.start()
-        
-        # Wait a bit to ensure monitor starts properly
-        time.sleep(2)
-        if monitor_error:
-            print(f"Error: {monitor_error}", file=sys.stderr)
+        def report_monitor_exit(future):
+            e = future.exception()
+            if e is not None:
+                print(f"Error: Error in monitor thread: {e}", file=sys.stderr)
+            elif future.result() != 0:
+                print(f"Error: Human Trial Monitor exited with code {future.result()}", file=sys.stderr)
             # Continue anyway - dashboard can still be useful without monitor
+        
+        monitor_future.add_done_callback(report_monitor_exit)
+        
+        # Always enable some debug logging for troubleshooting
+        print(f"Starting monitor with studies: {args.study}, interval: {args.interval}s")
+        
+        # A daemon thread rather than an executor worker, which would be joined at exit
+        threading.Thread(target=run_monitor, name="HumanTrialMonitorLauncher", daemon=True).start()
 
     print("Services are running:")
     print(f"- Dashboard: http://localhost:{args.port}")
@@ -606,31 +870,35 @@ def main():
     dashboard_url = f"http://localhost:{args.port}"
     if args.browser_path:
         print(f"Attempting to launch custom browser: {args.browser_path}")
-        try:
-            browser_process = subprocess.Popen([args.browser_path, dashboard_url], preexec_fn=os.setsid,
-                                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            CHILD_PROCESSES.append(browser_process)
-            print("Custom browser process launched.")
-        except FileNotFoundError:
+        browser_bin = shutil.which(args.browser_path)
+        if browser_bin is None:
             print(f"Error: Custom browser executable not found at {args.browser_path}", file=sys.stderr)
-        except Exception as e:
-            print(f"Error launching custom browser: {e}", file=sys.stderr)
+        else:
+            try:
+                browser_process = subprocess.Popen([browser_bin, dashboard_url], start_new_session=True,
+                                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                CHILD_PROCESSES.append(browser_process)
+                print("Custom browser process launched.")
+            except Exception as e:
+                print(f"Error launching custom browser: {e}", file=sys.stderr)
+
+    # Block in a watcher thread until the dashboard exits, so the main thread
+    # can sleep on the shutdown event instead of polling the process
+    # (the monitor is in-process, so there is no separate process to watch)
+    def watch_dashboard():
+        dashboard_process.wait()
+        _SHUTDOWN.set()
+
+    threading.Thread(target=watch_dashboard, name="DashboardWatcher", daemon=True).start()
 
     print("\nPress Ctrl+C to stop all services.")
     try:
-        # Keep the main script running indefinitely
-        while True:
-            time.sleep(1)
-            # Check if dashboard or monitor processes have died
-            if dashboard_process.poll() is not None:
-                print("Optuna Dashboard process terminated unexpectedly.", file=sys.stderr)
-                break
-            # The monitor is now in-process, so no separate process to check
-            # if monitor_process.poll() is not None:
-            #     print("Human Trial Monitor process terminated unexpectedly.", file=sys.stderr)
-            #     break
-    except KeyboardInterrupt:
-        print("Ctrl+C received. Stopping services...")
+        # Keep the main script running until the dashboard exits or a signal arrives
+        _SHUTDOWN.wait()
+        if dashboard_process.poll() is not None:
+            print("Optuna Dashboard process terminated unexpectedly.", file=sys.stderr)
+        else:
+            print("Shutdown requested. Stopping services...")
     finally:
         cleanup_processes()
 
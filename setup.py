@@ -28,5 +28,5 @@ setup(
         'Intended Audience :: Science/Research',
         'Topic :: Scientific/Engineering :: Artificial Intelligence',
     ],
-    python_requires='>=3.7',
+    python_requires='>=3.8',
 )
\ No newline at end of file